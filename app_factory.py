@@ -0,0 +1,112 @@
+from fastapi import FastAPI, Request, Response
+from contextlib import asynccontextmanager
+import anyio
+import asyncio
+import threading
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from fastapi.utils import is_body_allowed_for_status_code
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from config import get_settings
+from database.database import get_engine, get_health_engine, init_db, warm_pool
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def _deferred_init(app: FastAPI, stop_event: threading.Event):
+    """
+    Initialize services in the background so the server can accept connections immediately.
+    The blocking steps run in worker threads, which stop early once stop_event is set.
+    """
+    settings = get_settings()
+    try:
+        # Initialize database off the event loop
+        if not await asyncio.to_thread(init_db, stop_event=stop_event):
+            return
+        logger.info("Database connection initialized during startup")
+        await asyncio.to_thread(warm_pool, stop_event)
+        if stop_event.is_set():
+            return
+
+        # Log environment variables (without sensitive data)
+        logger.info("SUPABASE_URL is set: %s", bool(settings.supabase_url))
+        logger.info("SUPABASE_KEY is set: %s", bool(settings.supabase_key))
+        logger.info("SUPABASE_BUCKET_NAME: %s", settings.supabase_bucket_name)
+
+        # Log all registered routes when debugging
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Registered routes: %s", [(route.path, getattr(route, 'methods', None)) for route in app.routes])
+
+        app.state.ready = True
+    except Exception as e:
+        logger.error("Error during startup: %s", e)
+        # Don't raise the exception, let the app start without database
+
+async def _http_exception_handler(request: Request, exc: StarletteHTTPException):
+    """Render HTTPException with orjson, FastAPI's built-in handler uses the stdlib encoder"""
+    headers = getattr(exc, "headers", None)
+    if not is_body_allowed_for_status_code(exc.status_code):
+        return Response(status_code=exc.status_code, headers=headers)
+    return ORJSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=headers)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize services on startup and release them on shutdown"""
+    # Sync handlers and database work run in the threadpool, allow more of them at once
+    anyio.to_thread.current_default_thread_limiter().total_tokens = get_settings().threadpool_size
+    stop_event = threading.Event()
+    init_task = asyncio.create_task(_deferred_init(app, stop_event))
+
+    yield
+
+    # Cancelling the task would not stop its worker thread, so signal the thread
+    # and wait for it to return before the engine is disposed under it
+    stop_event.set()
+    await init_task
+    if get_health_engine.cache_info().currsize:
+        await asyncio.to_thread(get_health_engine().dispose)
+    if get_engine.cache_info().currsize:
+        await asyncio.to_thread(get_engine().dispose)
+
+def create_app(enable_pdf: bool = False) -> FastAPI:
+    """
+    Build a configured application.
+    The PDF router creates its storage client at import time, so it is only
+    imported when enabled.
+    """
+    settings = get_settings()
+    app = FastAPI(
+        title="Simplim Backend",
+        version="1.0.0",
+        docs_url="/docs",
+        redoc_url="/redoc",
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan
+    )
+    # Set once deferred startup initialization has completed
+    app.state.ready = False
+    app.add_exception_handler(StarletteHTTPException, _http_exception_handler)
+
+    # Include routers
+    from routers import auth, system
+    app.include_router(system.router)
+    app.include_router(auth.router, prefix="/auth", tags=["authentication"])
+    if enable_pdf:
+        from routers import pdf
+        app.include_router(pdf.router, prefix="/pdf", tags=["pdf"])
+
+    # Compress larger JSON bodies (monitor dumps, lists), small probe responses stay as-is
+    app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=4)
+
+    # Explicit origins let the middleware match with a set lookup
+    origins = [origin.strip() for origin in settings.cors_origins.split(",") if origin.strip()]
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins or [settings.frontend_url],
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE"],
+        allow_headers=["authorization", "content-type"],
+        max_age=86400,  # Let browsers cache preflight responses for a day
+    )
+    return app
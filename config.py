@@ -0,0 +1,62 @@
+from functools import lru_cache
+from typing import Optional
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+class Settings(BaseSettings):
+    """Application settings read once from the environment and .env file"""
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore", frozen=True)
+
+    environment: str = "development"
+    port: str = "8000"
+    debug_sql: bool = False
+    serverless: bool = False
+    frontend_url: str = "http://localhost:3000"
+    cors_origins: str = ""  # Comma-separated, defaults to frontend_url when empty
+    log_level: str = "INFO"
+    threadpool_size: int = 100
+    health_ttl: float = 5.0
+
+    # MySQL connection (Railway internal variables in production)
+    mysql_user: Optional[str] = Field(None, validation_alias="MYSQLUSER")
+    mysql_password: Optional[str] = Field(None, validation_alias="MYSQLPASSWORD")
+    mysql_host: Optional[str] = Field(None, validation_alias="MYSQLHOST")
+    mysql_port: Optional[str] = Field(None, validation_alias="MYSQLPORT")
+    mysql_database: Optional[str] = None
+    mysql_public_url: Optional[str] = None
+
+    # Connection pool
+    db_pool_size: Optional[int] = None
+    db_max_connections: Optional[int] = None
+    db_max_overflow: int = 10
+    db_connection_headroom: int = 10  # Connections kept free for admin and migration sessions
+    db_pool_timeout: int = 10
+    db_pool_pre_ping: bool = False
+    db_pool_recycle: int = 1800
+    db_query_cache_size: int = 1200
+    web_concurrency: int = 1  # Must match the worker count the server is started with
+    railway_replica_count: int = 1
+
+    # Access token signing key
+    secret_key: str = "your-secret-key-here"
+
+    # Password hashing cost, defaults to 12 in production and 10 elsewhere
+    bcrypt_rounds: Optional[int] = None
+
+    # Supabase storage
+    supabase_url: Optional[str] = None
+    supabase_key: Optional[str] = None
+    supabase_bucket_name: str = "pdfs"
+
+    # Shared response cache, in-process caching only when unset
+    redis_url: Optional[str] = None
+
+    # Text simplification
+    openai_api_key: Optional[str] = None
+    qdrant_url: str = "http://localhost:6333"
+    qdrant_api_key: str = ""
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Get the process-wide settings instance"""
+    return Settings()
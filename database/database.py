@@ -1,91 +1,268 @@
-from sqlalchemy import create_engine
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
-import os
-import urllib.parse
+from sqlalchemy.pool import NullPool, QueuePool
+from config import get_settings
+import random
+import socket
+import threading
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+# SQL statement logging is expensive, only enable it when explicitly requested
+logging.getLogger("sqlalchemy.engine").setLevel(
+    logging.INFO if get_settings().debug_sql else logging.WARNING
+)
 
-# Get environment
-ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
-
-# Initialize engine as None
-engine = None
-SessionLocal = None
+# Prefer the C-based mysqlclient driver, fall back to pure-Python PyMySQL
+try:
+    import MySQLdb  # noqa: F401
+    MYSQL_DRIVER = "mysqldb"
+except ImportError:
+    MYSQL_DRIVER = "pymysql"
 
 def get_db_url():
     """Get database URL based on environment"""
+    settings = get_settings()
     try:
-        if ENVIRONMENT == "production":
+        if settings.environment == "production":
             # Use internal URL for Railway deployment
-            MYSQL_USER = os.getenv("MYSQLUSER")
-            MYSQL_PASSWORD = os.getenv("MYSQLPASSWORD")
-            MYSQL_HOST = os.getenv("MYSQLHOST")
-            MYSQL_PORT = os.getenv("MYSQLPORT")
-            MYSQL_DATABASE = os.getenv("MYSQL_DATABASE")
-            
+            MYSQL_USER = settings.mysql_user
+            MYSQL_PASSWORD = settings.mysql_password
+            MYSQL_HOST = settings.mysql_host
+            MYSQL_PORT = settings.mysql_port
+            MYSQL_DATABASE = settings.mysql_database
+
             if not all([MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_PORT, MYSQL_DATABASE]):
                 raise ValueError("Missing required MySQL environment variables")
-                
-            return f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
+
+            # URL.create escapes credentials containing ':', '@' or '/'
+            return URL.create(
+                f"mysql+{MYSQL_DRIVER}",
+                username=MYSQL_USER,
+                password=MYSQL_PASSWORD,
+                host=MYSQL_HOST,
+                port=int(MYSQL_PORT),
+                database=MYSQL_DATABASE
+            )
         else:
             # Use public URL for local development
-            MYSQL_PUBLIC_URL = os.getenv("MYSQL_PUBLIC_URL")
+            MYSQL_PUBLIC_URL = settings.mysql_public_url
             if not MYSQL_PUBLIC_URL:
                 raise ValueError("MYSQL_PUBLIC_URL environment variable is not set")
-            
-            # Ensure the URL uses pymysql
-            parsed_url = urllib.parse.urlparse(MYSQL_PUBLIC_URL)
-            if parsed_url.scheme == "mysql":
-                return MYSQL_PUBLIC_URL.replace("mysql://", "mysql+pymysql://", 1)
-            return MYSQL_PUBLIC_URL
+
+            # Ensure the URL uses the selected driver
+            url = make_url(MYSQL_PUBLIC_URL)
+            if url.drivername == "mysql":
+                return url.set(drivername=f"mysql+{MYSQL_DRIVER}")
+            return url
     except Exception as e:
-        logger.error(f"Error getting database URL: {str(e)}")
+        logger.error("Error getting database URL: %s", e)
         raise
 
-def init_db():
-    """Initialize database connection"""
-    global engine, SessionLocal
+def get_pool_size():
+    """
+    Get the per-worker connection pool size.
+    Every uvicorn worker in every replica holds its own pool, so the total
+    number of MySQL connections is (pool_size + max_overflow) * workers * replicas,
+    which must stay below the server's max_connections minus some headroom.
+    When DB_POOL_SIZE is not set and DB_MAX_CONNECTIONS is, the pool size is
+    derived from that budget.
+    """
+    settings = get_settings()
+    if settings.db_pool_size:
+        return settings.db_pool_size
+
+    if not settings.db_max_connections:
+        return 20
+
+    # Each worker's share of the budget also has to cover its overflow connections
+    processes = settings.web_concurrency * settings.railway_replica_count
+    budget = settings.db_max_connections - settings.db_connection_headroom
+    return max(1, budget // processes - settings.db_max_overflow)
+
+def _enable_keepalive(dbapi_connection, connection_record):
+    """Turn on TCP keepalive so connections silently dropped by NAT are detected in seconds"""
     try:
-        db_url = get_db_url()
-        logger.info(f"Initializing database connection to: {db_url}")
-        
-        # Create engine with connection parameters
-        engine = create_engine(
-            db_url,
-            pool_pre_ping=True,  # Enable connection health checks
-            pool_recycle=1800,   # Recycle connections after 30 minutes
-            pool_size=20,        # Maximum number of connections to keep
-            max_overflow=10,     # Maximum number of connections that can be created beyond pool_size
-            pool_timeout=30,     # Seconds to wait before giving up on getting a connection from the pool
-            connect_args={
-                "connect_timeout": 5,    # Connection timeout in seconds
-                "read_timeout": 5,       # Read timeout in seconds
-                "write_timeout": 5,      # Write timeout in seconds
-                "charset": "utf8mb4"     # Use utf8mb4 charset
-            }
-        )
-        
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        # PyMySQL exposes its socket, mysqlclient only its file descriptor
+        sock = getattr(dbapi_connection, "_sock", None)
+        if sock is not None:
+            _set_keepalive(sock)
+        elif hasattr(dbapi_connection, "fileno"):
+            # Options set through a duplicate descriptor apply to the shared socket
+            with socket.fromfd(dbapi_connection.fileno(), socket.AF_INET, socket.SOCK_STREAM) as sock:
+                _set_keepalive(sock)
+    except OSError as e:
+        logger.warning("Could not enable TCP keepalive: %s", e)
+
+def _set_keepalive(sock: socket.socket):
+    """Set the keepalive options on a connected socket"""
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # Fine-grained keepalive timers are only available on some platforms (e.g. Linux)
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+
+@lru_cache(maxsize=1)
+def get_engine():
+    """Create the process-wide database engine on first use"""
+    settings = get_settings()
+    db_url = get_db_url()
+    logger.debug("Initializing database connection to: %s", db_url.host)
+
+    connect_args = {
+        "connect_timeout": 5,    # TCP handshake timeout in seconds
+        "read_timeout": 15,      # Bound slow queries and hung sockets
+        "write_timeout": 15,     # Bound stalled writes
+        "charset": "utf8mb4"     # Use utf8mb4 charset
+    }
+
+    if settings.serverless:
+        # Short-lived workers can't reuse pooled sockets, so open one per checkout
+        pool_args = {"poolclass": NullPool}
+        connect_args["connect_timeout"] = 3
+    else:
+        pool_args = {
+            "poolclass": QueuePool,
+            # Pre-ping costs an extra round trip per checkout, so it is opt-in;
+            # recycling below MySQL's wait_timeout keeps stale sockets out of the pool
+            "pool_pre_ping": settings.db_pool_pre_ping,
+            "pool_recycle": settings.db_pool_recycle,  # Recycle connections after 30 minutes
+            "pool_size": get_pool_size(),              # Maximum number of connections to keep
+            "max_overflow": settings.db_max_overflow,  # Connections that can be created beyond pool_size
+            "pool_timeout": settings.db_pool_timeout   # Seconds to wait for a connection from the pool
+        }
+
+    # Create engine with connection parameters
+    engine = create_engine(
+        db_url,
+        echo=False,
+        future=True,
+        # Neither mysqlclient nor PyMySQL supports server-side prepared statements,
+        # so the compiled statement cache is what avoids re-compiling repeated queries
+        query_cache_size=settings.db_query_cache_size,
+        connect_args=connect_args,
+        **pool_args
+    )
+    event.listen(engine, "connect", _enable_keepalive)
+    return engine
+
+@lru_cache(maxsize=1)
+def get_health_engine():
+    """
+    Create a single-connection engine for health probes.
+    It is kept apart from the request pool so that a saturated pool can't
+    make the health check time out and report the database as down.
+    """
+    settings = get_settings()
+    if settings.serverless:
+        # NullPool already opens a fresh connection for every checkout
+        return get_engine()
+
+    engine = create_engine(
+        get_db_url(),
+        echo=False,
+        future=True,
+        poolclass=QueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_recycle=settings.db_pool_recycle,
+        pool_timeout=settings.db_pool_timeout,
+        connect_args={
+            "connect_timeout": 3,
+            "read_timeout": 5,
+            "write_timeout": 5,
+            "charset": "utf8mb4"
+        }
+    )
+    event.listen(engine, "connect", _enable_keepalive)
+    return engine
+
+@lru_cache(maxsize=1)
+def get_sessionmaker():
+    """Create the session factory bound to the shared engine on first use"""
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+def init_db(max_attempts: int = 6, stop_event: Optional[threading.Event] = None) -> bool:
+    """
+    Initialize database connection.
+    Retries the first connection with jittered exponential backoff so that
+    workers don't crash-loop together while MySQL is still starting up.
+    Returns False when stop_event is set before a connection succeeds.
+    """
+    stop_event = stop_event or threading.Event()
+    try:
+        get_sessionmaker()
+        for attempt in range(max_attempts):
+            try:
+                with get_engine().connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                break
+            except OperationalError as e:
+                if attempt == max_attempts - 1:
+                    raise
+                delay = min(2 ** attempt, 15) + random.random()
+                logger.warning("Database not reachable (attempt %s/%s), retrying in %.1fs: %s", attempt + 1, max_attempts, delay, e)
+                if stop_event.wait(delay):
+                    logger.info("Database initialization stopped")
+                    return False
         logger.info("Database connection initialized successfully")
+        return True
     except Exception as e:
-        logger.error(f"Error initializing database: {str(e)}")
+        logger.error("Error initializing database: %s", e)
         raise
 
+def warm_pool(stop_event: Optional[threading.Event] = None):
+    """
+    Open pool_size connections in parallel so the first requests after startup
+    don't each pay the TCP handshake and MySQL authentication round trips.
+    Connections not yet started when stop_event is set are skipped.
+    """
+    if get_settings().serverless:
+        return 0
+
+    engine = get_engine()
+    stop_event = stop_event or threading.Event()
+
+    def _connect():
+        if stop_event.is_set():
+            return None
+        conn = engine.connect()
+        conn.execute(text("SELECT 1"))
+        return conn
+
+    # Hold every connection until all are open so each pool slot gets its own
+    conns = []
+    with ThreadPoolExecutor(max_workers=engine.pool.size()) as executor:
+        futures = [executor.submit(_connect) for _ in range(engine.pool.size())]
+        for future in futures:
+            try:
+                conn = future.result()
+                if conn is not None:
+                    conns.append(conn)
+            except Exception as e:
+                logger.warning("Could not open pooled connection: %s", e)
+    for conn in conns:
+        conn.close()
+    logger.info("Warmed %s pooled database connections", len(conns))
+    return len(conns)
+
 def get_db():
-    """Get database session"""
-    db = SessionLocal()
+    """Get a database session, FastAPI caches the dependency so a request shares one session"""
+    db = get_sessionmaker()()
     try:
         yield db
     finally:
         db.close()
 
 # Create Base for models
-Base = declarative_base() 
\ No newline at end of file
+Base = declarative_base()
@@ -1,11 +0,0 @@
-from database.database import engine
-from database.models import Base
-
-def init_db():
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
-
-if __name__ == "__main__":
-    print("Creating database tables...")
-    init_db()
-    print("Database tables created successfully!") 
\ No newline at end of file
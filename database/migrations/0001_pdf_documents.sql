@@ -0,0 +1,16 @@
+-- Brings a pdf_documents table created before the listing, dedup and direct
+-- upload changes up to date. create_all only creates missing tables, so
+-- existing tables need these statements applied by hand before init_db.py runs.
+
+-- Newest-first listing per user (keyset pagination)
+CREATE INDEX ix_pdf_user_date ON pdf_documents (user_id, upload_date DESC);
+-- The composite index above now backs the user_id foreign key
+DROP INDEX ix_pdf_documents_user_id ON pdf_documents;
+
+-- Per-user content-hash deduplication
+ALTER TABLE pdf_documents ADD COLUMN sha256 VARCHAR(64);
+CREATE INDEX ix_pdf_user_sha256 ON pdf_documents (user_id, sha256);
+
+-- Direct client uploads, one entry per stored object
+ALTER TABLE pdf_documents ADD COLUMN storage_key VARCHAR(190);
+ALTER TABLE pdf_documents ADD UNIQUE INDEX storage_key (storage_key);
@@ -1,32 +1,49 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Index
 from sqlalchemy.sql import func
 from database.database import Base
 
+# Shared MySQL table options
+MYSQL_TABLE_ARGS = {
+    "mysql_engine": "InnoDB",
+    "mysql_charset": "utf8mb4",
+    "mysql_collate": "utf8mb4_unicode_ci"
+}
+
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = MYSQL_TABLE_ARGS
 
     id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True)
-    username = Column(String, unique=True, index=True)
-    hashed_password = Column(String)
+    email = Column(String(190), unique=True, index=True)  # 190 * 4 bytes fits InnoDB's index key limit
+    username = Column(String(64), unique=True, index=True)
+    hashed_password = Column(String(60))  # bcrypt hashes are 60 characters
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class TextHistory(Base):
     __tablename__ = "text_history"
+    __table_args__ = MYSQL_TABLE_ARGS
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     original_text = Column(Text)
     simplified_text = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class PDFDocument(Base):
     __tablename__ = "pdf_documents"
+    __table_args__ = MYSQL_TABLE_ARGS
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"))  # Indexed by ix_pdf_user_date
     filename = Column(String(255))
     file_path = Column(String(255))
     upload_date = Column(DateTime(timezone=True), server_default=func.now())
-    size = Column(Integer)  # in bytes 
\ No newline at end of file
+    size = Column(Integer)  # in bytes 
+    sha256 = Column(String(64))  # Content hash, a user's rows with the same hash share one stored object
+    storage_key = Column(String(190), unique=True)  # Object path of a direct client upload
+
+# Serves a user's newest-first listing as an index range scan, no filesort
+Index("ix_pdf_user_date", PDFDocument.user_id, PDFDocument.upload_date.desc())
+# Finds a user's existing copy of an upload
+Index("ix_pdf_user_sha256", PDFDocument.user_id, PDFDocument.sha256)
@@ -1,10 +1,88 @@
-from database.database import Base, engine
-from database.models import User, TextHistory, PDFDocument
+import hashlib
+import logging
+from sqlalchemy import Column, Integer, MetaData, String, Table, UniqueConstraint, inspect, select
+from database.database import Base, get_engine
+from database.models import User, TextHistory, PDFDocument  # noqa: F401 - registers the tables on Base.metadata
+
+logger = logging.getLogger(__name__)
+
+# Records the hash of the last schema created, kept out of Base.metadata
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("schema_hash", String(32), nullable=False)
+)
+
+def _unique_constraints(table):
+    """Column name tuples of a model table's unique constraints"""
+    return sorted(
+        tuple(constraint.columns.keys())
+        for constraint in table.constraints
+        if isinstance(constraint, UniqueConstraint)
+    )
+
+def get_schema_hash():
+    """Hash the table, column, index and unique constraint definitions declared on the models"""
+    schema = sorted(
+        (
+            table.name,
+            [(column.name, str(column.type), column.nullable) for column in table.columns],
+            sorted((index.name, index.unique, [str(expr) for expr in index.expressions]) for index in table.indexes),
+            _unique_constraints(table)
+        )
+        for table in Base.metadata.tables.values()
+    )
+    return hashlib.blake2b(str(schema).encode(), digest_size=16).hexdigest()
+
+def find_missing_schema(conn):
+    """
+    List the columns, indexes and unique constraints the models declare but
+    existing tables lack. create_all never alters an existing table.
+    """
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        missing += [f"column {table.name}.{column.name}" for column in table.columns if column.name not in columns]
+
+        indexes = inspector.get_indexes(table.name)
+        index_names = {index["name"] for index in indexes}
+        missing += [f"index {table.name}.{index.name}" for index in table.indexes if index.name not in index_names]
+
+        unique_columns = {tuple(index["column_names"]) for index in indexes if index["unique"]}
+        unique_columns |= {tuple(constraint["column_names"]) for constraint in inspector.get_unique_constraints(table.name)}
+        missing += [
+            f"unique constraint {table.name}({', '.join(names)})"
+            for names in _unique_constraints(table) if names not in unique_columns
+        ]
+    return missing
 
 def init_db():
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
-    print("Database tables created successfully!")
+    schema_hash = get_schema_hash()
+    with get_engine().begin() as conn:
+        schema_version.create(conn, checkfirst=True)
+        stored_hash = conn.execute(
+            select(schema_version.c.schema_hash).where(schema_version.c.id == 1)
+        ).scalar()
+        if stored_hash == schema_hash:
+            logger.info("Database schema is up to date, skipping table creation")
+            return
+
+        # Create missing tables, existing ones must already match the models
+        Base.metadata.create_all(bind=conn)
+        missing = find_missing_schema(conn)
+        if missing:
+            # Leave the stored hash alone so the check runs again after migrating
+            logger.error("Database schema is out of date, missing: %s", ", ".join(missing))
+            raise RuntimeError("Existing tables differ from the models, apply the scripts in database/migrations")
+        conn.execute(schema_version.delete())
+        conn.execute(schema_version.insert().values(id=1, schema_hash=schema_hash))
+    logger.info("Database tables created successfully!")
 
 if __name__ == "__main__":
-    init_db() 
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO)
+    init_db()
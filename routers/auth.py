@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import bindparam, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import timedelta
 
 from database.database import get_db
 from database.models import User
@@ -10,15 +11,33 @@ from utils.auth_utils import (
     verify_password,
     get_password_hash,
     create_access_token,
-    ACCESS_TOKEN_EXPIRE_MINUTES,
     get_current_user
 )
 from pydantic import BaseModel
-from typing import Optional
 import logging
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+# Built once so each login reuses the same statement and its cached compiled form
+LOGIN_STMT = (
+    select(User.id, User.hashed_password, User.is_active)
+    .where(User.username == bindparam("username"))
+)
+
+def _user_response(username: str, email: str, is_active: bool, status_code: int = status.HTTP_200_OK):
+    """
+    Serialize a user in the UserResponse shape.
+    Returning a Response skips FastAPI's response_model validation, the
+    response_model declarations are kept for the OpenAPI schema.
+    """
+    return ORJSONResponse({
+        "username": username,
+        "email": email,
+        "is_active": is_active
+    }, status_code=status_code)
+
 class UserCreate(BaseModel):
     username: str
     email: str
@@ -37,20 +56,10 @@ class Token(BaseModel):
     token_type: str
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+def register(user: UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
     try:
-        # Check if username or email already exists
-        db_user = db.query(User).filter(
-            (User.username == user.username) | (User.email == user.email)
-        ).first()
-        if db_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username or email already registered"
-            )
-        
-        # Create new user
+        # Create new user, the unique indexes on username and email reject duplicates
         hashed_password = get_password_hash(user.password)
         db_user = User(
             username=user.username,
@@ -60,9 +69,17 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         )
         
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
-        return db_user
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Username or email already registered"
+            )
+        # Every response field is known client-side, so the expired instance
+        # is not refreshed (MySQL has no INSERT ... RETURNING)
+        return _user_response(user.username, user.email, True, status.HTTP_201_CREATED)
     except HTTPException:
         raise
     except Exception as e:
@@ -73,15 +90,13 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         )
 
 @router.post("/login", response_model=Token)
-async def login(
+def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
     try:
-        # Find user by username with specific columns to reduce data transfer
-        user = db.query(User).filter(User.username == form_data.username).with_entities(
-            User.id, User.username, User.hashed_password, User.is_active
-        ).first()
+        # Fetch only the columns login needs as a plain row, no ORM instance is built
+        user = db.execute(LOGIN_STMT, {"username": form_data.username}).first()
         
         if not user:
             raise HTTPException(
@@ -106,17 +121,17 @@ async def login(
         
         # Create access token with user ID instead of username for better performance
         access_token = create_access_token(data={"sub": str(user.id)})
-        return {"access_token": access_token, "token_type": "bearer"}
+        return ORJSONResponse({"access_token": access_token, "token_type": "bearer"})
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Login error: {str(e)}")
+        logger.error("Login error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred during login. Please try again."
         )
 
 @router.get("/me", response_model=UserResponse)
-async def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user 
\ No newline at end of file
+def read_users_me(current_user: User = Depends(get_current_user)):
+    return _user_response(current_user.username, current_user.email, current_user.is_active) 
\ No newline at end of file
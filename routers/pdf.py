@@ -1,10 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
-import os
 from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, Field
+from uuid import uuid4
+import hashlib
 import logging
+import orjson
+import re
+from database.database import get_db
+from database.models import PDFDocument as DBPDFDocument, User as DBUser
 from services.supabase_storage_service import SupabaseStorageService
+from utils.auth_utils import get_current_user
+from utils.response_cache import cache_get, cache_hget, cache_hset, cache_incr
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -15,191 +26,374 @@ router = APIRouter()
 # Initialize storage service
 storage_service = SupabaseStorageService()
 
+# Listing pages are cached per user in one Redis hash per generation. Uploads and
+# deletes bump the generation, so a page read before the change and written after
+# it lands under the old generation and is never served.
+_PDF_LIST_TTL = 3600
+
+def _pdf_generation_key(user_id: int) -> bytes:
+    """Redis key holding the current listing cache generation of a user"""
+    return b"pdfs:%d:gen" % user_id
+
+def _cached_pdf_page(user_id: int, page_key: bytes):
+    """Get the user's current listing cache key and the page cached under it, if any"""
+    generation = cache_get(_pdf_generation_key(user_id)) or b"0"
+    cache_key = b"pdfs:%d:%s" % (user_id, generation)
+    return cache_key, cache_hget(cache_key, page_key)
+
+def _invalidate_pdf_list(user_id: int):
+    """Start a new listing cache generation for the user"""
+    cache_incr(_pdf_generation_key(user_id))
+
 # Add a test endpoint
 @router.get("/test")
 async def test_pdf():
     """Test endpoint to verify PDF router is working"""
     return {"message": "PDF router is working"}
 
+# Every PDF file starts with this header
+_PDF_MAGIC = b"%PDF-"
+
+# Largest PDF accepted through a direct client upload
+_MAX_DIRECT_UPLOAD = 100 * 1024 * 1024
+
+# Object names minted by /upload/init, other objects in the user's folder belong to older entries
+_DIRECT_UPLOAD_NAME = re.compile(r"[0-9a-f]{32}\.pdf")
+
+class UploadComplete(BaseModel):
+    key: str
+    original_name: str = Field(..., min_length=1, max_length=255)
+    size: int
+
+def _hash_upload(fileobj):
+    """Hash a spooled upload in one pass, returning its sha256 hex digest and size and leaving it rewound"""
+    digest = hashlib.sha256()  # OpenSSL-backed, uses SHA extensions where the CPU has them
+    size = 0
+    while chunk := fileobj.read(1 << 20):
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest(), size
+
+def _object_path(user_id: int, digest: str) -> str:
+    """Storage path of a content-addressed PDF, shared only between one user's uploads"""
+    return f"sha256/{user_id}/{digest}.pdf"
+
+def _lock_user_pdfs(db: Session, user_id: int):
+    """
+    Lock the user's row until the transaction ends. Linking a new entry to a
+    content-addressed object and removing an unreferenced one both hold it,
+    only for their database work and the object removal, never for a transfer.
+    """
+    db.query(DBUser.id).filter(DBUser.id == user_id).with_for_update().first()
+
+def _find_pdf_by_hash(db: Session, user_id: int, digest: str):
+    """Lock the user's content-addressed PDFs and get their entry with the given hash, if any"""
+    _lock_user_pdfs(db, user_id)
+    return db.query(DBPDFDocument.file_path).filter(
+        DBPDFDocument.user_id == user_id,
+        DBPDFDocument.sha256 == digest
+    ).first()
+
+def _save_hashed_pdf(db: Session, db_pdf: DBPDFDocument) -> bool:
+    """
+    Lock the user's content-addressed PDFs and persist a new entry,
+    returning whether other entries already shared its stored object
+    """
+    _lock_user_pdfs(db, db_pdf.user_id)
+    shared = db.query(DBPDFDocument.id).filter(
+        DBPDFDocument.user_id == db_pdf.user_id,
+        DBPDFDocument.sha256 == db_pdf.sha256
+    ).first() is not None
+    _save_pdf(db, db_pdf)
+    return shared
+
+def _delete_pdf_entry(db: Session, db_pdf: DBPDFDocument) -> bool:
+    """
+    Lock the user's content-addressed PDFs and remove an entry without committing,
+    returning whether other entries still share its stored object
+    """
+    _lock_user_pdfs(db, db_pdf.user_id)
+    db.delete(db_pdf)
+    db.flush()
+    return db.query(DBPDFDocument.id).filter(
+        DBPDFDocument.user_id == db_pdf.user_id,
+        DBPDFDocument.sha256 == db_pdf.sha256
+    ).first() is not None
+
+def _find_pdf_by_key(db: Session, storage_key: str):
+    """Get the entry recorded for a direct upload's object, if any"""
+    return db.query(DBPDFDocument.id).filter(DBPDFDocument.storage_key == storage_key).first()
+
+def _save_pdf(db: Session, db_pdf: DBPDFDocument):
+    """Persist a PDF document entry"""
+    db.add(db_pdf)
+    db.commit()
+    db.refresh(db_pdf)
+
+def _delete_pdf(db: Session, db_pdf: DBPDFDocument):
+    """Remove a PDF document entry"""
+    db.delete(db_pdf)
+    db.commit()
+
 @router.post("/upload")
-async def test_upload_pdf(file: UploadFile = File(...)):
-    """Test endpoint for uploading PDF files without authentication"""
+async def upload_pdf(
+    file: UploadFile = File(...),
+    user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Upload a PDF for the current user"""
     try:
-        # Log the incoming file details
-        logger.info(f"Attempting to upload file: {file.filename}")
-        
-        # Validate file type
-        if not file.filename.lower().endswith('.pdf'):
-            raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-
-        # Log Supabase configuration
-        logger.info(f"Supabase URL configured: {bool(os.getenv('SUPABASE_URL'))}")
-        logger.info(f"Supabase Key configured: {bool(os.getenv('SUPABASE_KEY'))}")
-        logger.info(f"Supabase Bucket: {os.getenv('SUPABASE_BUCKET_NAME', 'pdfs')}")
-
-        # Upload file using storage service (using a test user ID of 1)
+        # Validate file type from its content, the client-supplied name proves nothing
+        head = await file.read(len(_PDF_MAGIC))
+        await file.seek(0)
+        if head != _PDF_MAGIC:
+            raise HTTPException(status_code=400, detail="Not a PDF")
+
+        # Identical content from the same user is stored once, re-uploads link to the existing object
+        digest, size = await run_in_threadpool(_hash_upload, file.file)
+        object_path = _object_path(user.id, digest)
+        db_pdf = DBPDFDocument(
+            user_id=user.id,
+            filename=file.filename,
+            size=size,
+            sha256=digest
+        )
         try:
-            file_info = await storage_service.upload_file(file, 1)
-            if not file_info:
-                logger.error("Storage service returned None for file_info")
-                raise HTTPException(
-                    status_code=500,
-                    detail="Failed to upload file - storage service returned no file info"
-                )
-            return {
-                "message": "File uploaded successfully",
-                "file_info": file_info
-            }
-        except ValueError as ve:
-            logger.error(f"Validation error: {str(ve)}")
-            raise HTTPException(status_code=400, detail=str(ve))
-        except Exception as storage_error:
-            logger.error(f"Storage service error: {str(storage_error)}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Storage service error: {str(storage_error)}"
-            )
-
-    except HTTPException as he:
-        # Re-raise HTTP exceptions as they are already properly formatted
-        raise he
+            existing = await run_in_threadpool(_find_pdf_by_hash, db, user.id, digest)
+            if existing:
+                # Link within the same locked transaction, so the object can't be removed first
+                logger.info("Reusing stored object for duplicate upload: %s", digest)
+                db_pdf.file_path = existing.file_path  # Store Supabase URL
+                await run_in_threadpool(_save_pdf, db, db_pdf)
+            else:
+                # Release the lock for the transfer, re-uploading the same digest is an idempotent upsert
+                await run_in_threadpool(db.rollback)
+                file_info = await storage_service.upload_file(file, user.id, object_path=object_path)
+                if not file_info:
+                    raise HTTPException(status_code=500, detail="Failed to upload file")
+                db_pdf.file_path = file_info["url"]  # Store Supabase URL
+
+                # A delete of a concurrent copy may have removed the object before this entry
+                # was committed, but none can once it is. Only then re-check the object.
+                shared = await run_in_threadpool(_save_hashed_pdf, db, db_pdf)
+                if not shared and not await storage_service.read_object_head(object_path, 1):
+                    logger.warning("Object removed during upload, uploading again: %s", digest)
+                    await file.seek(0)
+                    if not await storage_service.upload_file(file, user.id, object_path=object_path):
+                        logger.error("Failed to restore object for entry %s", db_pdf.id)
+        except Exception:
+            await run_in_threadpool(db.rollback)
+            raise
+        url = db_pdf.file_path
+        await run_in_threadpool(_invalidate_pdf_list, user.id)
+        logger.info("Created database entry for file: %s", file.filename)
+
+        return {
+            "id": db_pdf.id,
+            "filename": db_pdf.filename,
+            "size": db_pdf.size,
+            "upload_date": db_pdf.upload_date,
+            "url": url,
+            "original_name": file.filename
+        }
+
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Unexpected error in test_upload_pdf: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Unexpected error: {str(e)}"
+        logger.error("Error in upload_pdf: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/upload/init")
+async def init_upload(user: DBUser = Depends(get_current_user)):
+    """
+    Start a direct upload: the client uploads the PDF straight to storage with the
+    returned signed URL, then calls /upload/complete with the key.
+    """
+    key = f"users/{user.id}/{uuid4().hex}.pdf"
+    signed = await storage_service.create_upload_url(key)
+    if not signed:
+        raise HTTPException(status_code=500, detail="Failed to create upload URL")
+    return {"url": signed["url"], "token": signed["token"], "key": key}
+
+@router.post("/upload/complete")
+async def complete_upload(
+    upload: UploadComplete,
+    user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Record a PDF the client uploaded directly to storage"""
+    prefix = f"users/{user.id}/"
+    if not upload.key.startswith(prefix) or not _DIRECT_UPLOAD_NAME.fullmatch(upload.key[len(prefix):]):
+        raise HTTPException(status_code=400, detail="Invalid upload key")
+
+    try:
+        # Each object is recorded once, checked before the failure path below can delete it
+        if await run_in_threadpool(_find_pdf_by_key, db, upload.key):
+            raise HTTPException(status_code=409, detail="Upload already completed")
+
+        # Signed upload URLs cannot limit size or type, so check the stored object
+        stored = await storage_service.read_object_head(upload.key, len(_PDF_MAGIC))
+        if not stored:
+            raise HTTPException(status_code=404, detail="Uploaded file not found")
+        if stored["head"] != _PDF_MAGIC or stored["size"] != upload.size or stored["size"] > _MAX_DIRECT_UPLOAD:
+            await storage_service.delete_object(upload.key)
+            raise HTTPException(status_code=400, detail="Not a PDF or size mismatch")
+
+        # Create database entry, the unique storage key rejects a concurrent second completion
+        url = storage_service.get_public_url(upload.key)
+        db_pdf = DBPDFDocument(
+            user_id=user.id,
+            filename=upload.original_name,
+            file_path=url,  # Store Supabase URL
+            size=stored["size"],
+            storage_key=upload.key
+        )
+        try:
+            await run_in_threadpool(_save_pdf, db, db_pdf)
+        except IntegrityError:
+            await run_in_threadpool(db.rollback)
+            raise HTTPException(status_code=409, detail="Upload already completed")
+        await run_in_threadpool(_invalidate_pdf_list, user.id)
+        logger.info("Created database entry for direct upload: %s", upload.key)
+
+        return {
+            "id": db_pdf.id,
+            "filename": db_pdf.filename,
+            "size": db_pdf.size,
+            "upload_date": db_pdf.upload_date,
+            "url": url,
+            "original_name": upload.original_name
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error in complete_upload: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _pdf_page(db: Session, user_id: int, cursor: Optional[datetime], cursor_id: Optional[int], limit: int):
+    """Get one newest-first page of a user's PDFs, starting after the (cursor, cursor_id) position"""
+    query = db.query(DBPDFDocument).filter(DBPDFDocument.user_id == user_id)
+    if cursor is not None:
+        # Keyset condition, the id breaks ties between uploads in the same second
+        query = query.filter(or_(
+            DBPDFDocument.upload_date < cursor,
+            and_(DBPDFDocument.upload_date == cursor, DBPDFDocument.id < (cursor_id or 0))
+        ))
+    return query.order_by(
+        DBPDFDocument.upload_date.desc(), DBPDFDocument.id.desc()
+    ).limit(limit).all()
+
+@router.get("/list")
+async def list_pdfs(
+    cursor: Optional[datetime] = None,
+    cursor_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=100),
+    user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    List the current user's PDFs, newest first.
+    Pass the returned next_cursor values as cursor and cursor_id to get the next page.
+    """
+    # The cache client is synchronous, keep its round trips off the event loop
+    page_key = f"{cursor.isoformat() if cursor else ''}:{cursor_id or ''}:{limit}".encode()
+    cache_key, cached = await run_in_threadpool(_cached_pdf_page, user.id, page_key)
+    if cached is not None:
+        return Response(cached, media_type="application/json")
+
+    try:
+        # Get database entries
+        db_pdfs = await run_in_threadpool(_pdf_page, db, user.id, cursor, cursor_id, limit)
+
+        # Get user's PDFs from storage in one listing, indexed by name. Only entries
+        # without a content hash or storage key need it to find their object.
+        files_by_name = {}
+        if any(db_pdf.sha256 is None and db_pdf.storage_key is None for db_pdf in db_pdfs):
+            files = await storage_service.list_user_files(user.id)
+            files_by_name = {f["filename"]: f for f in files}
+
+        # Combine storage and database info
+        pdf_list = []
+        for db_pdf in db_pdfs:
+            if db_pdf.sha256 or db_pdf.storage_key:
+                # Content-addressed and directly uploaded objects are not named after the entry
+                url = db_pdf.file_path
+            else:
+                file_info = files_by_name.get(db_pdf.filename)
+                if not file_info:
+                    continue
+                url = file_info["url"]
+            pdf_list.append({
+                "id": db_pdf.id,
+                "filename": db_pdf.filename,
+                "size": db_pdf.size,
+                "upload_date": db_pdf.upload_date,
+                "url": url
+            })
+
+        next_cursor = None
+        if len(db_pdfs) == limit:
+            last = db_pdfs[-1]
+            next_cursor = {"cursor": last.upload_date, "cursor_id": last.id}
+        body = orjson.dumps({"items": pdf_list, "next_cursor": next_cursor})
+        await run_in_threadpool(cache_hset, cache_key, page_key, body, _PDF_LIST_TTL)
+        return Response(body, media_type="application/json")
+
+    except Exception as e:
+        logger.error("Error in list_pdfs: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/{pdf_id}")
+async def delete_pdf(
+    pdf_id: int,
+    user: DBUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Delete one of the current user's PDFs"""
+    try:
+        # Get PDF
+        pdf = await run_in_threadpool(
+            lambda: db.query(DBPDFDocument).filter(
+                DBPDFDocument.id == pdf_id,
+                DBPDFDocument.user_id == user.id
+            ).first()
         )
 
-# Import dependencies
-# from database.database import get_db
-# from database.models import PDFDocument as DBPDFDocument, User as DBUser
-# from routers.auth import oauth2_scheme
-# from jose import jwt
-# from utils.auth_utils import SECRET_KEY, ALGORITHM
-
-# @router.post("/upload")
-# async def upload_pdf(
-#     file: UploadFile = File(...),
-#     token: str = Depends(oauth2_scheme),
-#     db: Session = Depends(get_db)
-# ):
-#     try:
-#         # Verify user
-#         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-#         email: str = payload.get("sub")
-#         user = db.query(DBUser).filter(DBUser.email == email).first()
-        
-#         if not user:
-#             raise HTTPException(status_code=404, detail="User not found")
-
-#         # Validate file type
-#         if not file.filename.lower().endswith('.pdf'):
-#             raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-
-#         # Upload file using storage service
-#         file_info = await storage_service.upload_file(file, user.id)
-#         if not file_info:
-#             raise HTTPException(status_code=500, detail="Failed to upload file")
-
-#         # Create database entry
-#         db_pdf = DBPDFDocument(
-#             user_id=user.id,
-#             filename=file_info["filename"],
-#             file_path=file_info["url"],  # Store Supabase URL
-#             size=file_info["size"]
-#         )
-#         db.add(db_pdf)
-#         db.commit()
-#         db.refresh(db_pdf)
-#         logger.info(f"Created database entry for file: {file_info['filename']}")
-
-#         return {
-#             "id": db_pdf.id,
-#             "filename": db_pdf.filename,
-#             "size": db_pdf.size,
-#             "upload_date": db_pdf.upload_date,
-#             "url": file_info["url"],
-#             "original_name": file_info["original_name"]
-#         }
-
-#     except Exception as e:
-#         logger.error(f"Error in upload_pdf: {str(e)}")
-#         raise HTTPException(status_code=500, detail=str(e))
-
-# @router.get("/list")
-# async def list_pdfs(
-#     token: str = Depends(oauth2_scheme),
-#     db: Session = Depends(get_db)
-# ):
-#     try:
-#         # Verify user
-#         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-#         email: str = payload.get("sub")
-#         user = db.query(DBUser).filter(DBUser.email == email).first()
-        
-#         if not user:
-#             raise HTTPException(status_code=404, detail="User not found")
-
-#         # Get user's PDFs from storage
-#         files = await storage_service.list_user_files(user.id)
-        
-#         # Get database entries
-#         db_pdfs = db.query(DBPDFDocument).filter(
-#             DBPDFDocument.user_id == user.id
-#         ).order_by(DBPDFDocument.upload_date.desc()).all()
-        
-#         # Combine storage and database info
-#         pdf_list = []
-#         for db_pdf in db_pdfs:
-#             file_info = next((f for f in files if f["filename"] == db_pdf.filename), None)
-#             if file_info:
-#                 pdf_list.append({
-#                     "id": db_pdf.id,
-#                     "filename": db_pdf.filename,
-#                     "size": db_pdf.size,
-#                     "upload_date": db_pdf.upload_date,
-#                     "url": file_info["url"]
-#                 })
-
-#         return pdf_list
-
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=str(e))
-
-# @router.delete("/{pdf_id}")
-# async def delete_pdf(
-#     pdf_id: int,
-#     token: str = Depends(oauth2_scheme),
-#     db: Session = Depends(get_db)
-# ):
-#     try:
-#         # Verify user
-#         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-#         email: str = payload.get("sub")
-#         user = db.query(DBUser).filter(DBUser.email == email).first()
-        
-#         if not user:
-#             raise HTTPException(status_code=404, detail="User not found")
-
-#         # Get PDF
-#         pdf = db.query(DBPDFDocument).filter(
-#             DBPDFDocument.id == pdf_id,
-#             DBPDFDocument.user_id == user.id
-#         ).first()
-
-#         if not pdf:
-#             raise HTTPException(status_code=404, detail="PDF not found")
-
-#         # Delete from storage
-#         success = await storage_service.delete_file(pdf.filename, user.id)
-#         if not success:
-#             raise HTTPException(status_code=500, detail="Failed to delete file from storage")
-
-#         # Delete database entry
-#         db.delete(pdf)
-#         db.commit()
-
-#         return {"message": "PDF deleted successfully"}
-
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        if not pdf:
+            raise HTTPException(status_code=404, detail="PDF not found")
+
+        if pdf.sha256:
+            # The shared object goes with its last reference. It is removed before
+            # the commit releases the user's lock, so no upload can link to it meanwhile.
+            try:
+                shared = await run_in_threadpool(_delete_pdf_entry, db, pdf)
+                if not shared and not await storage_service.delete_object(_object_path(user.id, pdf.sha256)):
+                    logger.warning("Failed to delete unreferenced object: %s", pdf.sha256)
+                await run_in_threadpool(db.commit)
+            except Exception:
+                await run_in_threadpool(db.rollback)
+                raise
+        elif pdf.storage_key:
+            # Directly uploaded objects are stored under their own key
+            if not await storage_service.delete_object(pdf.storage_key):
+                raise HTTPException(status_code=500, detail="Failed to delete file from storage")
+            await run_in_threadpool(_delete_pdf, db, pdf)
+        else:
+            # Delete from storage
+            success = await storage_service.delete_file(pdf.filename, user.id)
+            if not success:
+                raise HTTPException(status_code=500, detail="Failed to delete file from storage")
+
+            # Delete database entry
+            await run_in_threadpool(_delete_pdf, db, pdf)
+        await run_in_threadpool(_invalidate_pdf_list, user.id)
+
+        return {"message": "PDF deleted successfully"}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error in delete_pdf: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,12 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
-from models.user import User, TextHistory, TextHistoryCreate
-from routers.auth import oauth2_scheme
+from models.user import TextHistory
 from database.database import get_db
 from database.models import TextHistory as DBTextHistory, User as DBUser
 from sqlalchemy.orm import Session
-from jose import jwt
-from utils.auth_utils import SECRET_KEY, ALGORITHM
+from utils.auth_utils import get_current_user
 from utils.simplify_agent import SimplifyAgent
 from pydantic import BaseModel
 
@@ -20,15 +19,10 @@ class SimplifyRequest(BaseModel):
 @router.post("/text", response_model=TextHistory)
 async def simplify_text(
     request: SimplifyRequest,
-    token: str = Depends(oauth2_scheme),
+    user: DBUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     try:
-        # Get user from token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        user = db.query(DBUser).filter(DBUser.email == email).first()
-        
         if request.previous_point_id:
             # Handle follow-up request
             result = await simplify_agent.handle_follow_up(
@@ -50,25 +44,24 @@ async def simplify_text(
             simplified_text=result["simplified_text"],
             vector_id=result["point_id"]
         )
-        db.add(db_history)
-        db.commit()
-        db.refresh(db_history)
+        await run_in_threadpool(_save_history, db, db_history)
         
         return db_history
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _save_history(db: Session, db_history: DBTextHistory):
+    """Persist a simplification history entry"""
+    db.add(db_history)
+    db.commit()
+    db.refresh(db_history)
+
 @router.get("/history", response_model=List[TextHistory])
-async def get_simplification_history(
-    token: str = Depends(oauth2_scheme),
+def get_simplification_history(
+    user: DBUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     try:
-        # Get user from token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        user = db.query(DBUser).filter(DBUser.email == email).first()
-        
         # Get user's history from MySQL
         history = db.query(DBTextHistory).filter(
             DBTextHistory.user_id == user.id
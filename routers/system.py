@@ -0,0 +1,374 @@
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import text, select
+from sqlalchemy.orm import Session
+from datetime import datetime
+import asyncio
+import threading
+import time
+import logging
+import orjson
+
+from config import get_settings
+from database.database import get_db, get_engine, get_health_engine
+from database.models import User
+from utils.response_cache import cache_get, cache_set
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+settings = get_settings()
+ENVIRONMENT = settings.environment
+
+# Storage configuration does not change at runtime
+SUPABASE_URL = settings.supabase_url
+SUPABASE_KEY = settings.supabase_key
+SUPABASE_BUCKET = settings.supabase_bucket_name
+SUPABASE_CONFIGURED = bool(SUPABASE_URL and SUPABASE_KEY)
+_STORAGE_STATUS = {
+    "bucket": SUPABASE_BUCKET,
+    "url_set": bool(SUPABASE_URL),
+    "key_set": bool(SUPABASE_KEY),
+    "status": "configured" if SUPABASE_CONFIGURED else "not_configured"
+}
+
+# Last formatted timestamp, refreshed at most once per second
+_TS = [0, ""]
+
+def _now_iso():
+    """Get the current UTC time in ISO 8601 format (with a Z suffix) at one-second resolution"""
+    now = int(time.time())
+    if now != _TS[0]:
+        _TS[0] = now
+        _TS[1] = datetime.utcfromtimestamp(now).isoformat() + "Z"
+    return _TS[1]
+
+# Pre-serialized constant parts of the / and /health responses
+_ROOT_PREFIX = orjson.dumps({
+    "status": "ok",
+    "message": "Simplim API is running",
+    "environment": ENVIRONMENT
+})[:-1]
+_HEALTH_STATIC = b"," + orjson.dumps({
+    "version": "1.0.0",
+    "environment": ENVIRONMENT,
+    "storage": _STORAGE_STATUS
+})[1:-1]
+
+# Full / body for the current timestamp, rebuilt when the second rolls over
+_ROOT_BODY = [None, b""]
+
+# Probe bodies never change
+_ALIVE_BODY = orjson.dumps({"status": "alive"})
+_HEALTHZ_BODY = orjson.dumps({"status": "ok"})
+_READY_BODY = orjson.dumps({"status": "ready"})
+
+# /health responses are reused for HEALTH_TTL seconds, the lock makes
+# concurrent probes wait for a single refresh instead of all probing at once
+_HEALTH_TTL = settings.health_ttl
+_HEALTH_CACHE = {"ts": 0.0, "body": None, "healthy": False}
+_HEALTH_LOCK = asyncio.Lock()
+
+# information_schema table sizes per database, reused for this many seconds
+_TABLE_SIZES_TTL = 60.0
+_TABLE_SIZES_CACHE = {}
+_TABLE_SIZES_LOCK = threading.Lock()
+
+# Server threads for /monitor/db, a constant-time lookup that also checks the connection
+_MONITOR_DB_STATS = text("""
+    SELECT VARIABLE_VALUE AS threads_connected
+    FROM performance_schema.global_status
+    WHERE VARIABLE_NAME = 'Threads_connected'
+""")
+
+# Server threads and user count for /monitor/db?detail=1, one round trip for both
+_MONITOR_DB_DETAIL_STATS = text("""
+    SELECT 'threads' AS name, VARIABLE_VALUE AS value
+    FROM performance_schema.global_status
+    WHERE VARIABLE_NAME = 'Threads_connected'
+    UNION ALL
+    SELECT 'users', COUNT(*) FROM users
+""")
+
+# Monitor responses shared across workers through Redis; the stale copy is
+# served when the database is unreachable
+_MONITOR_DB_TTL = 30
+_MONITOR_DB_KEYS = {False: b"monitor:db", True: b"monitor:db:detail"}
+_MONITOR_DB_STALE_TTL = 600
+_MONITOR_USERS_KEY = b"monitor:users"
+_MONITOR_USERS_TTL = 30
+_MONITOR_USERS_MAX_CACHED = 1024 * 1024  # Larger user dumps are streamed but not cached
+
+@router.get("/")
+async def root():
+    """Root endpoint"""
+    timestamp = _now_iso()
+    if timestamp is not _ROOT_BODY[0]:
+        _ROOT_BODY[0] = timestamp
+        _ROOT_BODY[1] = _ROOT_PREFIX + b',"timestamp":"' + timestamp.encode() + b'"}'
+    return Response(_ROOT_BODY[1], media_type="application/json")
+
+def check_database():
+    """Run the database health probe on the dedicated health engine"""
+    try:
+        with get_health_engine().connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return "healthy", None
+    except Exception as e:
+        logger.error("Database health check failed: %s", e)
+        return "unhealthy", str(e)
+
+@router.get("/healthz")
+async def healthz():
+    """
+    Constant liveness response with no database or storage access.
+    main.py answers this path in HealthCheckInterceptor before it reaches
+    FastAPI, the route keeps it available on apps built by create_app alone.
+    """
+    return Response(_HEALTHZ_BODY, media_type="application/json")
+
+@router.get("/health/live")
+async def health_live():
+    """Liveness probe, succeeds as soon as the server is accepting requests"""
+    return Response(_ALIVE_BODY, media_type="application/json")
+
+@router.get("/health/ready")
+async def health_ready(request: Request):
+    """Readiness probe, fails until startup initialization has completed"""
+    if not request.app.state.ready:
+        return ORJSONResponse(status_code=503, content={"status": "starting"})
+    return Response(_READY_BODY, media_type="application/json")
+
+async def _check_db():
+    """Database sub-check for /health"""
+    db_status, db_error = await run_in_threadpool(check_database)
+    return "database", db_status, db_error
+
+async def _check_storage():
+    """Storage sub-check for /health, only unhealthy if environment variables are missing"""
+    if not SUPABASE_CONFIGURED:
+        return "storage", "unhealthy", None
+    return "storage", "unknown", None
+
+def _health_response():
+    """Build the /health response from the cached body"""
+    if not _HEALTH_CACHE["healthy"]:
+        return Response(_HEALTH_CACHE["body"], status_code=503, media_type="application/json")
+    return Response(
+        _HEALTH_CACHE["body"],
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={int(_HEALTH_TTL)}"}
+    )
+
+@router.get("/health")
+async def health_check():
+    """Health check endpoint for Railway"""
+    if time.monotonic() - _HEALTH_CACHE["ts"] < _HEALTH_TTL:
+        return _health_response()
+
+    async with _HEALTH_LOCK:
+        # Another request may have refreshed the result while this one waited
+        if time.monotonic() - _HEALTH_CACHE["ts"] >= _HEALTH_TTL:
+            await _refresh_health()
+    return _health_response()
+
+async def _refresh_health():
+    """Run the health sub-checks and cache the serialized result"""
+    health_status = {
+        "status": "healthy",
+        "timestamp": _now_iso(),
+        "services": {
+            "database": "unknown",
+            "storage": "unknown"
+        }
+    }
+    
+    # Run independent sub-checks concurrently
+    results = await asyncio.gather(_check_db(), _check_storage(), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error("Health sub-check failed: %s", result)
+            health_status["status"] = "unhealthy"
+            continue
+        name, status, error = result
+        health_status["services"][name] = status
+        if status == "unhealthy":
+            health_status["status"] = "unhealthy"
+        if error:
+            health_status[f"{name}_error"] = error
+    
+    # Append the pre-serialized version, environment and storage fields
+    body = orjson.dumps(health_status)[:-1] + _HEALTH_STATIC + b"}"
+    _HEALTH_CACHE.update(
+        ts=time.monotonic(),
+        body=body,
+        healthy=health_status["status"] == "healthy"
+    )
+
+@router.get("/db-status")
+def db_status(db: Session = Depends(get_db)):
+    """Check database connection status"""
+    try:
+        # Test database connection with a constant-time ping
+        db.execute(text("SELECT 1")).scalar()
+        return ORJSONResponse({
+            "status": "connected",
+            "message": "Database connection successful"
+        })
+    except Exception as e:
+        logger.error("Database connection failed: %s", e)
+        return ORJSONResponse(status_code=503, content={
+            "status": "disconnected",
+            "error": str(e)
+        })
+
+def get_table_sizes():
+    """Get table row counts and sizes, scanning information_schema at most once per _TABLE_SIZES_TTL seconds"""
+    database = get_engine().url.database
+    with _TABLE_SIZES_LOCK:
+        now = time.monotonic()
+        cached = _TABLE_SIZES_CACHE.get(database)
+        if cached and now - cached[0] < _TABLE_SIZES_TTL:
+            return cached[1]
+
+        with get_engine().connect() as conn:
+            table_sizes = conn.execute(text("""
+                SELECT table_name, table_rows, data_length, index_length 
+                FROM information_schema.tables 
+                WHERE table_schema = DATABASE()
+            """)).fetchall()
+
+        # Format table sizes
+        tables = []
+        for table in table_sizes:
+            tables.append({
+                "name": table[0],
+                "rows": table[1],
+                "size_mb": round((table[2] + table[3]) / 1024 / 1024, 2)
+            })
+
+        _TABLE_SIZES_CACHE[database] = (now, tables)
+        return tables
+
+@router.get("/monitor/db")
+def monitor_db(detail: bool = False, db: Session = Depends(get_db)):
+    """
+    Monitor database health and performance.
+    User and table statistics scan every table, so they are only included
+    with ?detail=1.
+    """
+    cache_key = _MONITOR_DB_KEYS[detail]
+    cache_headers = {"Cache-Control": f"max-age={_MONITOR_DB_TTL}"}
+    cached = cache_get(cache_key)
+    if cached:
+        return Response(cached, media_type="application/json", headers=cache_headers)
+
+    try:
+        # Check the connection and get server threads (and user count for detail)
+        if detail:
+            stats = dict(db.execute(_MONITOR_DB_DETAIL_STATS).all())
+            threads_connected = int(stats.get("threads") or 0)
+        else:
+            # VARIABLE_VALUE is a string column
+            threads_connected = int(db.execute(_MONITOR_DB_STATS).scalar() or 0)
+        
+        # Get connection pool usage for this worker
+        pool_status = get_engine().pool.status()
+        logger.debug("Connection pool status: %s", pool_status)
+        
+        result = {
+            "status": "healthy",
+            "connection": "active",
+            "threads_connected": threads_connected,
+            "pool": pool_status,
+            "timestamp": _now_iso()
+        }
+        if detail:
+            result["user_count"] = int(stats["users"])
+            result["tables"] = get_table_sizes()
+
+        body = orjson.dumps(result)
+        cache_set(cache_key, body, _MONITOR_DB_TTL)
+        cache_set(b"stale:" + cache_key, body, _MONITOR_DB_STALE_TTL)
+        return Response(body, media_type="application/json", headers=cache_headers)
+    except Exception as e:
+        logger.error("Database monitoring failed: %s", e)
+        content = {
+            "status": "unhealthy",
+            "error": str(e),
+            "timestamp": _now_iso()
+        }
+        # Keep the outage visible, the last successful result is only attached for context
+        stale = cache_get(b"stale:" + cache_key)
+        if stale:
+            content["last_known"] = orjson.loads(stale)
+            return ORJSONResponse(status_code=503, content=content, headers={"X-Cache": "stale"})
+        return ORJSONResponse(status_code=503, content=content)
+
+@router.get("/monitor/users")
+def monitor_users(
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0)
+):
+    """Stream a page of users, ordered by id, as newline-delimited JSON"""
+    # Use a dedicated streaming connection, request dependencies are
+    # torn down before the response body is sent. The query runs before
+    # streaming starts so failures can still be reported with a 503.
+    cache_key = b"%s:%d:%d" % (_MONITOR_USERS_KEY, limit, offset)
+    cached = cache_get(cache_key)
+    if cached:
+        return Response(cached, media_type="application/x-ndjson")
+
+    conn = None
+    try:
+        conn = get_engine().connect()
+        users = conn.execution_options(stream_results=True, yield_per=500).execute(
+            select(User.id, User.username, User.email, User.created_at)
+            .order_by(User.id)
+            .limit(limit)
+            .offset(offset)
+        )
+    except Exception as e:
+        if conn is not None:
+            conn.close()
+        logger.error("Error fetching users: %s", e)
+        return ORJSONResponse(status_code=503, content={
+            "status": "error",
+            "error": str(e),
+            "timestamp": _now_iso()
+        })
+
+    def generate():
+        # Keep a copy of small dumps so other workers can serve them from the cache
+        chunks, size = [], 0
+        try:
+            for user in users:
+                line = orjson.dumps({
+                    "id": user.id,
+                    "username": user.username,
+                    "email": user.email,
+                    "created_at": user.created_at
+                }) + b"\n"
+                if chunks is not None:
+                    size += len(line)
+                    if size <= _MONITOR_USERS_MAX_CACHED:
+                        chunks.append(line)
+                    else:
+                        chunks = None
+                yield line
+            if chunks is not None:
+                cache_set(cache_key, b"".join(chunks), _MONITOR_USERS_TTL)
+        except Exception as e:
+            logger.error("Error streaming users: %s", e)
+            # The 200 status is already sent, mark the page as incomplete in-band
+            yield orjson.dumps({
+                "status": "error",
+                "error": str(e),
+                "timestamp": _now_iso()
+            }) + b"\n"
+        finally:
+            conn.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
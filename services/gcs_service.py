@@ -1,4 +1,5 @@
 from google.cloud import storage
+from fastapi.concurrency import run_in_threadpool
 import os
 from datetime import datetime, timedelta
 import logging
@@ -22,22 +23,23 @@ class GCSService:
             blob_name = f"users/{user_id}/{file_name}"
             blob = self.bucket.blob(blob_name)
             
-            # Upload the file
-            blob.upload_from_string(
+            # Upload the file, the client is blocking so keep it off the event loop
+            await run_in_threadpool(
+                blob.upload_from_string,
                 file_data,
                 content_type='application/pdf'
             )
             
             # Make the blob publicly accessible
-            blob.make_public()
+            await run_in_threadpool(blob.make_public)
             
             # Get the public URL
             url = blob.public_url
-            logger.info(f"File uploaded successfully to {url}")
+            logger.info("File uploaded successfully to %s", url)
             return url
             
         except Exception as e:
-            logger.error(f"Error uploading file to GCS: {str(e)}")
+            logger.error("Error uploading file to GCS: %s", e)
             return None
             
     async def delete_file(self, file_name: str, user_id: int) -> bool:
@@ -48,12 +50,12 @@ class GCSService:
         try:
             blob_name = f"users/{user_id}/{file_name}"
             blob = self.bucket.blob(blob_name)
-            blob.delete()
-            logger.info(f"File deleted successfully from GCS: {blob_name}")
+            await run_in_threadpool(blob.delete)
+            logger.info("File deleted successfully from GCS: %s", blob_name)
             return True
             
         except Exception as e:
-            logger.error(f"Error deleting file from GCS: {str(e)}")
+            logger.error("Error deleting file from GCS: %s", e)
             return False
             
     async def get_file_url(self, file_name: str, user_id: int) -> Optional[str]:
@@ -74,7 +76,7 @@ class GCSService:
             return url
             
         except Exception as e:
-            logger.error(f"Error generating signed URL: {str(e)}")
+            logger.error("Error generating signed URL: %s", e)
             return None
             
     async def list_user_files(self, user_id: int) -> list:
@@ -84,7 +86,8 @@ class GCSService:
         """
         try:
             prefix = f"users/{user_id}/"
-            blobs = self.bucket.list_blobs(prefix=prefix)
+            # The iterator pages lazily, so fetch every page in the threadpool
+            blobs = await run_in_threadpool(lambda: list(self.bucket.list_blobs(prefix=prefix)))
             
             files = []
             for blob in blobs:
@@ -98,7 +101,7 @@ class GCSService:
             return files
             
         except Exception as e:
-            logger.error(f"Error listing user files: {str(e)}")
+            logger.error("Error listing user files: %s", e)
             return []
             
     async def get_file_metadata(self, file_name: str, user_id: int) -> Optional[dict]:
@@ -108,7 +111,7 @@ class GCSService:
         """
         try:
             blob_name = f"users/{user_id}/{file_name}"
-            blob = self.bucket.get_blob(blob_name)
+            blob = await run_in_threadpool(self.bucket.get_blob, blob_name)
             
             if blob:
                 return {
@@ -122,5 +125,5 @@ class GCSService:
             return None
             
         except Exception as e:
-            logger.error(f"Error getting file metadata: {str(e)}")
+            logger.error("Error getting file metadata: %s", e)
             return None 
\ No newline at end of file
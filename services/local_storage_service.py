@@ -3,20 +3,46 @@ import shutil
 from datetime import datetime
 import logging
 from typing import Optional
-import aiofiles
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
 import mimetypes
-from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+def _copy_upload(src, dest_path: str):
+    """
+    Copy an uploaded file to dest_path.
+    Uploads that Starlette already spooled to disk are copied by the kernel
+    with sendfile, with no round trip through Python buffers; in-memory
+    spools and platforms without file-to-file sendfile use a 1 MiB buffered copy.
+    """
+    src.seek(0)
+    with open(dest_path, 'wb') as out:
+        # SpooledTemporaryFile.fileno() would force an in-memory spool to disk
+        if getattr(src, "_rolled", True):
+            try:
+                in_fd = src.fileno()
+                size = os.fstat(in_fd).st_size
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(out.fileno(), in_fd, offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                return
+            except (AttributeError, OSError):
+                src.seek(0)
+                out.seek(0)
+                out.truncate()
+        shutil.copyfileobj(src, out, 1024 * 1024)
+
 class LocalStorageService:
     def __init__(self):
         # Base directory for all uploads
         self.base_dir = os.getenv('UPLOAD_DIR', '/app/uploads')
         # Ensure base directory exists
         os.makedirs(self.base_dir, exist_ok=True)
-        logger.info(f"Using upload directory: {self.base_dir}")
+        logger.info("Using upload directory: %s", self.base_dir)
         
     async def upload_file(self, file: UploadFile, user_id: int) -> Optional[dict]:
         """
@@ -26,7 +52,7 @@ class LocalStorageService:
         try:
             # Create user directory
             user_dir = os.path.join(self.base_dir, str(user_id))
-            os.makedirs(user_dir, exist_ok=True)
+            await run_in_threadpool(os.makedirs, user_dir, exist_ok=True)
             
             # Generate unique filename
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -34,12 +60,10 @@ class LocalStorageService:
             file_path = os.path.join(user_dir, safe_filename)
             
             # Save file
-            async with aiofiles.open(file_path, 'wb') as out_file:
-                content = await file.read()
-                await out_file.write(content)
+            await run_in_threadpool(_copy_upload, file.file, file_path)
             
             # Get file info
-            file_size = os.path.getsize(file_path)
+            file_size = await run_in_threadpool(os.path.getsize, file_path)
             content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
             
             file_info = {
@@ -51,11 +75,11 @@ class LocalStorageService:
                 "upload_date": datetime.now().isoformat()
             }
             
-            logger.info(f"File uploaded successfully: {file_info}")
+            logger.info("File uploaded successfully: %s", file_info)
             return file_info
             
         except Exception as e:
-            logger.error(f"Error uploading file: {str(e)}")
+            logger.error("Error uploading file: %s", e)
             return None
             
     async def delete_file(self, filename: str, user_id: int) -> bool:
@@ -65,14 +89,15 @@ class LocalStorageService:
         """
         try:
             file_path = os.path.join(self.base_dir, str(user_id), filename)
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                logger.info(f"File deleted successfully: {file_path}")
-                return True
-            return False
+            try:
+                await run_in_threadpool(os.remove, file_path)
+            except FileNotFoundError:
+                return False
+            logger.info("File deleted successfully: %s", file_path)
+            return True
             
         except Exception as e:
-            logger.error(f"Error deleting file: {str(e)}")
+            logger.error("Error deleting file: %s", e)
             return False
             
     async def get_file_path(self, filename: str, user_id: int) -> Optional[str]:
@@ -87,7 +112,7 @@ class LocalStorageService:
             return None
             
         except Exception as e:
-            logger.error(f"Error getting file path: {str(e)}")
+            logger.error("Error getting file path: %s", e)
             return None
             
     async def list_user_files(self, user_id: int) -> list:
@@ -97,26 +122,29 @@ class LocalStorageService:
         """
         try:
             user_dir = os.path.join(self.base_dir, str(user_id))
-            if not os.path.exists(user_dir):
-                return []
-                
-            files = []
-            for filename in os.listdir(user_dir):
-                file_path = os.path.join(user_dir, filename)
-                if os.path.isfile(file_path):
-                    stat = os.stat(file_path)
-                    files.append({
-                        "filename": filename,
-                        "size": stat.st_size,
-                        "created": datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                        "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                        "path": file_path
-                    })
-            
-            return files
+
+            def _scan():
+                if not os.path.exists(user_dir):
+                    return []
+                files = []
+                for filename in os.listdir(user_dir):
+                    file_path = os.path.join(user_dir, filename)
+                    if os.path.isfile(file_path):
+                        stat = os.stat(file_path)
+                        files.append({
+                            "filename": filename,
+                            "size": stat.st_size,
+                            "created": datetime.fromtimestamp(stat.st_ctime).isoformat(),
+                            "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                            "path": file_path
+                        })
+                return files
+
+            # Directory scans are blocking syscalls, run them off the event loop
+            return await run_in_threadpool(_scan)
             
         except Exception as e:
-            logger.error(f"Error listing user files: {str(e)}")
+            logger.error("Error listing user files: %s", e)
             return []
             
     async def get_file_metadata(self, filename: str, user_id: int) -> Optional[dict]:
@@ -126,10 +154,10 @@ class LocalStorageService:
         """
         try:
             file_path = os.path.join(self.base_dir, str(user_id), filename)
-            if not os.path.exists(file_path):
+            try:
+                stat = await run_in_threadpool(os.stat, file_path)
+            except FileNotFoundError:
                 return None
-                
-            stat = os.stat(file_path)
             return {
                 "filename": filename,
                 "size": stat.st_size,
@@ -140,7 +168,7 @@ class LocalStorageService:
             }
             
         except Exception as e:
-            logger.error(f"Error getting file metadata: {str(e)}")
+            logger.error("Error getting file metadata: %s", e)
             return None
             
     async def cleanup_old_files(self, days: int = 30) -> int:
@@ -149,22 +177,25 @@ class LocalStorageService:
         Returns number of files deleted
         """
         try:
-            count = 0
             cutoff_date = datetime.now().timestamp() - (days * 24 * 60 * 60)
-            
-            for user_dir in os.listdir(self.base_dir):
-                user_path = os.path.join(self.base_dir, user_dir)
-                if os.path.isdir(user_path):
-                    for filename in os.listdir(user_path):
-                        file_path = os.path.join(user_path, filename)
-                        if os.path.isfile(file_path):
-                            if os.path.getmtime(file_path) < cutoff_date:
-                                os.remove(file_path)
-                                count += 1
-                                
-            logger.info(f"Cleaned up {count} old files")
+
+            def _cleanup():
+                count = 0
+                for user_dir in os.listdir(self.base_dir):
+                    user_path = os.path.join(self.base_dir, user_dir)
+                    if os.path.isdir(user_path):
+                        for filename in os.listdir(user_path):
+                            file_path = os.path.join(user_path, filename)
+                            if os.path.isfile(file_path):
+                                if os.path.getmtime(file_path) < cutoff_date:
+                                    os.remove(file_path)
+                                    count += 1
+                return count
+
+            count = await run_in_threadpool(_cleanup)
+            logger.info("Cleaned up %s old files", count)
             return count
             
         except Exception as e:
-            logger.error(f"Error cleaning up old files: {str(e)}")
+            logger.error("Error cleaning up old files: %s", e)
             return 0 
\ No newline at end of file
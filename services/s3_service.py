@@ -1,44 +1,85 @@
 import boto3
 import os
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from fastapi.concurrency import run_in_threadpool
+from utils.file_utils import file_size
 import logging
-from typing import Optional
+from typing import BinaryIO, Optional
 
 logger = logging.getLogger(__name__)
 
+# Files above the threshold go up as concurrent multipart uploads,
+# read from the source file one part at a time
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=16 * 1024 * 1024,
+    multipart_chunksize=32 * 1024 * 1024,  # Larger parts mean fewer requests per upload
+    max_concurrency=10,
+    use_threads=True
+)
+
+# Keep-alive pool shared by all requests, large enough for several concurrent
+# multipart uploads so parts reuse connections instead of new TLS handshakes
+CLIENT_CONFIG = Config(
+    max_pool_connections=50,
+    tcp_keepalive=True,
+    connect_timeout=3,
+    read_timeout=60,
+    retries={"mode": "adaptive", "max_attempts": 3}
+)
+
 class S3Service:
     def __init__(self):
         self.s3_client = boto3.client(
             's3',
             aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
             aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-            region_name=os.getenv('AWS_REGION', 'us-east-1')
+            region_name=os.getenv('AWS_REGION', 'us-east-1'),
+            config=CLIENT_CONFIG
         )
         self.bucket_name = os.getenv('AWS_BUCKET_NAME')
         
-    async def upload_file(self, file_data: bytes, file_name: str, user_id: int) -> Optional[str]:
+    async def upload_file(self, fileobj: BinaryIO, file_name: str, user_id: int,
+                          content_type: str = "application/pdf") -> Optional[str]:
         """
-        Upload a file to S3
+        Upload a file to S3, streaming it from a file object (e.g. UploadFile.file)
         Returns the S3 URL if successful, None if failed
         """
         try:
             # Create a unique key for the file
             s3_key = f"users/{user_id}/{file_name}"
             
-            # Upload the file
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=file_data
-            )
+            size = await run_in_threadpool(file_size, fileobj)
+            if size < TRANSFER_CONFIG.multipart_threshold:
+                # Small files go up in one PUT, skipping the transfer manager's
+                # size probing and executor setup
+                await run_in_threadpool(
+                    self.s3_client.put_object,
+                    Bucket=self.bucket_name,
+                    Key=s3_key,
+                    Body=fileobj,
+                    ContentLength=size,
+                    ContentType=content_type
+                )
+            else:
+                # Upload the file without buffering it in memory, off the event loop
+                await run_in_threadpool(
+                    self.s3_client.upload_fileobj,
+                    fileobj,
+                    self.bucket_name,
+                    s3_key,
+                    ExtraArgs={"ContentType": content_type},
+                    Config=TRANSFER_CONFIG
+                )
             
             # Generate the URL
             url = f"https://{self.bucket_name}.s3.amazonaws.com/{s3_key}"
-            logger.info(f"File uploaded successfully to {url}")
+            logger.info("File uploaded successfully to %s", url)
             return url
             
         except ClientError as e:
-            logger.error(f"Error uploading file to S3: {str(e)}")
+            logger.error("Error uploading file to S3: %s", e)
             return None
             
     async def delete_file(self, file_name: str, user_id: int) -> bool:
@@ -48,15 +89,16 @@ class S3Service:
         """
         try:
             s3_key = f"users/{user_id}/{file_name}"
-            self.s3_client.delete_object(
+            await run_in_threadpool(
+                self.s3_client.delete_object,
                 Bucket=self.bucket_name,
                 Key=s3_key
             )
-            logger.info(f"File deleted successfully from S3: {s3_key}")
+            logger.info("File deleted successfully from S3: %s", s3_key)
             return True
             
         except ClientError as e:
-            logger.error(f"Error deleting file from S3: {str(e)}")
+            logger.error("Error deleting file from S3: %s", e)
             return False
             
     async def get_file_url(self, file_name: str, user_id: int) -> Optional[str]:
@@ -77,5 +119,5 @@ class S3Service:
             return url
             
         except ClientError as e:
-            logger.error(f"Error generating pre-signed URL: {str(e)}")
+            logger.error("Error generating pre-signed URL: %s", e)
             return None 
\ No newline at end of file
@@ -1,47 +1,65 @@
-from supabase import create_client, Client
-import os
+from supabase import create_client
 from datetime import datetime
 import logging
 from typing import Optional, List, Dict, Any
 from fastapi import UploadFile
-import mimetypes
+from fastapi.concurrency import run_in_threadpool
+from utils.file_utils import file_size
+from config import get_settings
 import requests
-import io
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Connect and per-read timeouts for uploads, so a hung PUT can't hold a thread forever
+UPLOAD_TIMEOUT = (5, 120)
+
+class _UploadBody:
+    """
+    Read-only view of a spooled upload with a known length. requests would
+    otherwise call fileno() to size it, rolling an in-memory spool to disk.
+    """
+    def __init__(self, fileobj, size: int):
+        self._fileobj = fileobj
+        self._size = size
+
+    def __len__(self):
+        return self._size
+
+    def read(self, size: int = -1) -> bytes:
+        return self._fileobj.read(size)
+
 class SupabaseStorageService:
     def __init__(self):
         """Initialize the storage service with lazy loading"""
         self._client = None
         self._initialized = False
-        self._bucket_name = os.getenv('SUPABASE_BUCKET_NAME', 'pdfs')
-        logger.info(f"SupabaseStorageService initialized with bucket: {self._bucket_name}")
+        settings = get_settings()
+        self._url = settings.supabase_url
+        self._key = settings.supabase_key
+        self._bucket_name = settings.supabase_bucket_name
+        logger.info("SupabaseStorageService initialized with bucket: %s", self._bucket_name)
 
     def _ensure_initialized(self):
         """Ensure the client is initialized"""
         if not self._initialized:
             try:
-                supabase_url = os.getenv('SUPABASE_URL')
-                supabase_key = os.getenv('SUPABASE_KEY')
-                
-                if not supabase_url or not supabase_key:
+                if not self._url or not self._key:
                     logger.warning("Supabase credentials not found. Storage operations will fail.")
                     return False
                 
-                self._client = create_client(supabase_url, supabase_key)
+                self._client = create_client(self._url, self._key)
                 self._initialized = True
                 logger.info("Supabase client initialized successfully")
                 return True
             except Exception as e:
-                logger.error(f"Failed to initialize Supabase client: {str(e)}")
+                logger.error("Failed to initialize Supabase client: %s", e)
                 return False
         return True
 
-    async def upload_file(self, file: UploadFile, filename: str = None) -> Optional[Dict[str, Any]]:
-        """Upload a file to Supabase Storage"""
+    async def upload_file(self, file: UploadFile, filename: str = None, object_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Upload a file to Supabase Storage, under object_path when given"""
         try:
             if not self._ensure_initialized():
                 logger.error("Cannot upload file: Supabase client not initialized")
@@ -53,62 +71,68 @@ class SupabaseStorageService:
                 raise ValueError("Supabase client not initialized")
 
             # Log configuration status
-            logger.info(f"Attempting to upload file for user {filename}")
-            logger.info(f"Supabase URL configured: {bool(os.getenv('SUPABASE_URL'))}")
-            logger.info(f"Supabase Key configured: {bool(os.getenv('SUPABASE_KEY'))}")
-            logger.info(f"Using bucket: {self._bucket_name}")
+            logger.info("Attempting to upload file for user %s", filename)
+            logger.info("Supabase URL configured: %s", bool(self._url))
+            logger.info("Supabase Key configured: %s", bool(self._key))
+            logger.info("Using bucket: %s", self._bucket_name)
 
             # Verify bucket exists
             try:
-                buckets = self._client.storage.list_buckets()
+                buckets = await run_in_threadpool(self._client.storage.list_buckets)
                 bucket_names = [bucket.name for bucket in buckets]
                 if self._bucket_name not in bucket_names:
-                    logger.error(f"Bucket '{self._bucket_name}' not found in Supabase. Available buckets: {bucket_names}")
+                    logger.error("Bucket '%s' not found in Supabase. Available buckets: %s", self._bucket_name, bucket_names)
                     raise ValueError(f"Bucket '{self._bucket_name}' not found in Supabase")
-                logger.info(f"Verified bucket '{self._bucket_name}' exists")
+                logger.info("Verified bucket '%s' exists", self._bucket_name)
             except Exception as bucket_error:
-                logger.error(f"Error checking bucket existence: {str(bucket_error)}")
+                logger.error("Error checking bucket existence: %s", bucket_error)
                 raise ValueError(f"Error checking bucket existence: {str(bucket_error)}")
 
-            # Read file content
+            # Measure the spooled upload instead of reading it into memory
             try:
-                content = await file.read()
-                if not content:
+                size = await run_in_threadpool(file_size, file.file)
+                if not size:
                     logger.error("File content is empty")
                     raise ValueError("File content is empty")
-                logger.info(f"Successfully read file content, size: {len(content)} bytes")
+                logger.info("Upload size: %s bytes", size)
             except Exception as read_error:
-                logger.error(f"Error reading file: {str(read_error)}")
+                logger.error("Error reading file: %s", read_error)
                 raise ValueError(f"Error reading file: {str(read_error)}")
             
             # Generate unique filename
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             safe_filename = f"{timestamp}_{file.filename}"
-            file_path = f"users/{filename}/{safe_filename}"
-            logger.info(f"Generated file path: {file_path}")
+            file_path = object_path or f"users/{filename}/{safe_filename}"
+            logger.info("Generated file path: %s", file_path)
             
             try:
                 # Upload to Supabase Storage using direct HTTP request
                 logger.info("Attempting to upload to Supabase Storage...")
                 try:
                     # Construct the upload URL
-                    upload_url = f"{os.getenv('SUPABASE_URL')}/storage/v1/object/{self._bucket_name}/{file_path}"
-                    logger.info(f"Upload URL: {upload_url}")
+                    upload_url = f"{self._url}/storage/v1/object/{self._bucket_name}/{file_path}"
+                    logger.info("Upload URL: %s", upload_url)
 
                     # Set up headers
                     headers = {
-                        "Authorization": f"Bearer {os.getenv('SUPABASE_KEY')}",
+                        "Authorization": f"Bearer {self._key}",
                         "Content-Type": file.content_type or "application/pdf",
+                        "Content-Length": str(size),
                         "x-upsert": "true"  # Enable upsert
                     }
-                    logger.info(f"Request headers: {headers}")
 
-                    # Make the upload request
+                    # Stream the spooled file as the request body, off the event loop
                     logger.info("Sending upload request...")
-                    res = requests.post(upload_url, headers=headers, data=content)
-                    logger.info(f"Response status code: {res.status_code}")
-                    logger.info(f"Response headers: {res.headers}")
-                    logger.info(f"Response body: {res.text}")
+                    res = await run_in_threadpool(
+                        requests.post,
+                        upload_url,
+                        headers=headers,
+                        data=_UploadBody(file.file, size),
+                        timeout=UPLOAD_TIMEOUT
+                    )
+                    logger.info("Response status code: %s", res.status_code)
+                    logger.info("Response headers: %s", res.headers)
+                    logger.info("Response body: %s", res.text)
                     
                     if res.status_code not in [200, 201]:
                         error_msg = f"HTTP Upload Failed: {res.status_code} - {res.text}"
@@ -118,62 +142,118 @@ class SupabaseStorageService:
                     # Parse the response
                     try:
                         response_data = res.json()
-                        logger.info(f"Parsed response data: {response_data}")
+                        logger.info("Parsed response data: %s", response_data)
                     except Exception as json_error:
-                        logger.warning(f"Could not parse response as JSON: {str(json_error)}")
+                        logger.warning("Could not parse response as JSON: %s", json_error)
                         response_data = {}
 
-                    logger.info(f"Upload successful: {res.status_code}")
+                    logger.info("Upload successful: %s", res.status_code)
                 except requests.exceptions.RequestException as req_error:
-                    logger.error(f"Request error: {str(req_error)}")
+                    logger.error("Request error: %s", req_error)
                     raise ValueError(f"Request error: {str(req_error)}")
                 except Exception as upload_error:
-                    logger.error(f"Error during upload: {str(upload_error)}")
+                    logger.error("Error during upload: %s", upload_error)
                     raise ValueError(f"Error during upload: {str(upload_error)}")
 
                 # Get public URL
                 try:
                     url = self._client.storage.from_(self._bucket_name).get_public_url(file_path)
-                    logger.info(f"Generated public URL: {url}")
+                    logger.info("Generated public URL: %s", url)
                 except Exception as url_error:
-                    logger.error(f"Error getting public URL: {str(url_error)}")
+                    logger.error("Error getting public URL: %s", url_error)
                     raise ValueError(f"Error getting public URL: {str(url_error)}")
                 
                 file_info = {
                     "filename": safe_filename,
                     "original_name": file.filename,
                     "path": file_path,
-                    "size": len(content),
+                    "size": size,
                     "content_type": file.content_type or "application/pdf",
                     "url": url,
                     "upload_date": datetime.now().isoformat()
                 }
                 
-                logger.info(f"File uploaded successfully to Supabase: {file_info}")
+                logger.info("File uploaded successfully to Supabase: %s", file_info)
                 return file_info
                 
             except Exception as supabase_error:
-                logger.error(f"Supabase storage error: {str(supabase_error)}")
+                logger.error("Supabase storage error: %s", supabase_error)
                 raise Exception(f"Supabase storage error: {str(supabase_error)}")
             
         except Exception as e:
-            logger.error(f"Error uploading file to Supabase: {str(e)}")
+            logger.error("Error uploading file to Supabase: %s", e)
             return None
 
-    async def delete_file(self, filename: str) -> bool:
+    async def create_upload_url(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """Create a signed URL the client can upload one object to directly"""
+        try:
+            if not self._ensure_initialized():
+                logger.error("Cannot create upload URL: Supabase client not initialized")
+                return None
+
+            signed = await run_in_threadpool(
+                self._client.storage.from_(self._bucket_name).create_signed_upload_url, file_path
+            )
+            return {"url": signed["signed_url"], "token": signed["token"], "path": file_path}
+
+        except Exception as e:
+            logger.error("Error creating signed upload URL in Supabase: %s", e)
+            return None
+
+    async def read_object_head(self, file_path: str, length: int) -> Optional[Dict[str, Any]]:
+        """Read the first bytes and the total size of a stored object, None when it does not exist"""
+        try:
+            url = f"{self._url}/storage/v1/object/{self._bucket_name}/{file_path}"
+            headers = {
+                "Authorization": f"Bearer {self._key}",
+                "Range": f"bytes=0-{length - 1}"
+            }
+            res = await run_in_threadpool(requests.get, url, headers=headers, timeout=10)
+            if res.status_code == 206:
+                size = int(res.headers["Content-Range"].rsplit("/", 1)[1])
+            elif res.status_code == 200:
+                size = int(res.headers.get("Content-Length", len(res.content)))
+            else:
+                logger.warning("Object %s not readable: %s", file_path, res.status_code)
+                return None
+            return {"head": res.content[:length], "size": size}
+
+        except Exception as e:
+            logger.error("Error reading object from Supabase: %s", e)
+            return None
+
+    def get_public_url(self, file_path: str) -> Optional[str]:
+        """Get the public URL of an object by its path in the bucket"""
+        if not self._ensure_initialized():
+            return None
+        return self._client.storage.from_(self._bucket_name).get_public_url(file_path)
+
+    async def delete_file(self, filename: str, user_id: int) -> bool:
         """Delete a file from Supabase Storage"""
         try:
             if not self._ensure_initialized():
                 logger.error("Cannot delete file: Supabase client not initialized")
                 return False
 
-            file_path = f"users/{filename}/{filename}"
-            self._client.storage.from_(self._bucket_name).remove([file_path])
-            logger.info(f"File deleted successfully from Supabase: {file_path}")
-            return True
+            return await self.delete_object(f"users/{user_id}/{filename}")
             
         except Exception as e:
-            logger.error(f"Error deleting file from Supabase: {str(e)}")
+            logger.error("Error deleting file from Supabase: %s", e)
+            return False
+
+    async def delete_object(self, file_path: str) -> bool:
+        """Delete an object from Supabase Storage by its path in the bucket"""
+        try:
+            if not self._ensure_initialized():
+                logger.error("Cannot delete file: Supabase client not initialized")
+                return False
+
+            await run_in_threadpool(self._client.storage.from_(self._bucket_name).remove, [file_path])
+            logger.info("File deleted successfully from Supabase: %s", file_path)
+            return True
+
+        except Exception as e:
+            logger.error("Error deleting file from Supabase: %s", e)
             return False
 
     async def get_file_url(self, filename: str) -> Optional[str]:
@@ -188,14 +268,14 @@ class SupabaseStorageService:
             return url
             
         except Exception as e:
-            logger.error(f"Error getting file URL from Supabase: {str(e)}")
+            logger.error("Error getting file URL from Supabase: %s", e)
             return None
 
     async def list_user_files(self, user_id: int) -> List[Dict]:
         """List all files for a specific user"""
         try:
             prefix = f"users/{user_id}/"
-            response = self._client.storage.from_(self._bucket_name).list(prefix)
+            response = await run_in_threadpool(self._client.storage.from_(self._bucket_name).list, prefix)
             
             files = []
             for item in response:
@@ -210,7 +290,7 @@ class SupabaseStorageService:
             return files
             
         except Exception as e:
-            logger.error(f"Error listing user files from Supabase: {str(e)}")
+            logger.error("Error listing user files from Supabase: %s", e)
             return []
 
     async def get_file_metadata(self, filename: str, user_id: int) -> Optional[dict]:
@@ -228,5 +308,5 @@ class SupabaseStorageService:
             return None
             
         except Exception as e:
-            logger.error(f"Error getting file metadata from Supabase: {str(e)}")
+            logger.error("Error getting file metadata from Supabase: %s", e)
             return None 
\ No newline at end of file
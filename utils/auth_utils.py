@@ -1,31 +1,48 @@
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
+import jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from database.database import get_db
 from database.models import User
-import os
-from dotenv import load_dotenv
+from config import get_settings
+from utils.response_cache import cache_get, cache_set
+import orjson
+import threading
+import time
 import logging
 
-# Load environment variables
-load_dotenv()
+_settings = get_settings()
 
 # Security configuration
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")  # Use environment variable
+SECRET_KEY = _settings.secret_key
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Signing key as bytes and decode options, prepared once instead of per token
+_JWT_KEY = SECRET_KEY.encode()
+_JWT_DECODE_OPTIONS = {"require": ["sub", "exp"]}
+
+# bcrypt cost: 12 in production, 10 elsewhere to keep local logins and tests fast.
+# The cost is stored in each hash, so existing hashes verify with either setting.
+BCRYPT_ROUNDS = _settings.bcrypt_rounds or (12 if _settings.environment == "production" else 10)
+
 # Password hashing with optimized settings
 pwd_context = CryptContext(
     schemes=["bcrypt"],
     deprecated="auto",
-    bcrypt__rounds=12  # Reduced from default 13 for better performance while maintaining security
+    bcrypt__rounds=BCRYPT_ROUNDS
 )
 
+# passlib loads the bcrypt backend lazily on first use, resolve it at import
+# so the first login in each worker doesn't pay for it
+try:
+    pwd_context.handler("bcrypt").get_backend()
+except Exception as e:
+    logging.error("Could not load bcrypt backend: %s", e)
+
 # OAuth2 scheme with optimized settings
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl="auth/login",
@@ -37,7 +54,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     try:
         return pwd_context.verify(plain_password, hashed_password)
     except Exception as e:
-        logging.error(f"Password verification error: {str(e)}")
+        logging.error("Password verification error: %s", e)
         return False
 
 def get_password_hash(password: str) -> str:
@@ -45,7 +62,7 @@ def get_password_hash(password: str) -> str:
     try:
         return pwd_context.hash(password)
     except Exception as e:
-        logging.error(f"Password hashing error: {str(e)}")
+        logging.error("Password hashing error: %s", e)
         raise ValueError("Error hashing password")
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -57,13 +74,66 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         else:
             expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        encoded_jwt = jwt.encode(to_encode, _JWT_KEY, algorithm=ALGORITHM)
         return encoded_jwt
     except Exception as e:
-        logging.error(f"Token creation error: {str(e)}")
+        logging.error("Token creation error: %s", e)
         raise ValueError("Error creating access token")
 
-async def get_current_user(
+# Authenticated users by raw bearer token, as detached snapshots that never touch
+# a session. Entries live until the token expires but at most _USER_CACHE_TTL seconds.
+_USER_CACHE_TTL = 60.0
+_USER_CACHE_MAX = 1024
+_USER_CACHE = {}
+_USER_CACHE_LOCK = threading.Lock()
+
+def _cached_user(token: str):
+    """Get the cached user for a token, None when missing or expired"""
+    with _USER_CACHE_LOCK:
+        entry = _USER_CACHE.get(token)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del _USER_CACHE[token]
+            return None
+        return entry[1]
+
+def _cache_user(token: str, user: User, exp):
+    """Cache a user for a token, bounded by the token's own expiry"""
+    ttl = _USER_CACHE_TTL
+    if exp is not None:
+        ttl = min(ttl, exp - time.time())
+    if ttl <= 0:
+        return
+    with _USER_CACHE_LOCK:
+        if len(_USER_CACHE) >= _USER_CACHE_MAX:
+            # Evict the oldest entry, dicts keep insertion order
+            del _USER_CACHE[next(iter(_USER_CACHE))]
+        _USER_CACHE[token] = (time.monotonic() + ttl, user)
+
+# User rows shared across workers through Redis, keyed by user id. A deactivated
+# account is refused once both this and the per-token cache have expired.
+_USER_REDIS_TTL = 300
+
+def _load_user(db: Session, user_id: int) -> Optional[User]:
+    """
+    Load a user from Redis when cached there, otherwise from the database.
+    Returns a transient instance, so commits in the request session can't expire it.
+    """
+    key = b"user:%d" % user_id
+    cached = cache_get(key)
+    if cached:
+        # Transient instance with the cached columns, no database round trip
+        return User(**orjson.loads(cached))
+
+    row = db.query(User.id, User.username, User.email, User.is_active).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    fields = row._asdict()
+    cache_set(key, orjson.dumps(fields), _USER_REDIS_TTL)
+    return User(**fields)
+
+def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ) -> User:
@@ -73,20 +143,25 @@ async def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    user = _cached_user(token)
+    if user is not None:
+        return user
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError as e:
-        logging.error(f"JWT decode error: {str(e)}")
+        payload = jwt.decode(token, _JWT_KEY, algorithms=[ALGORITHM], options=_JWT_DECODE_OPTIONS)
+        user_id: str = payload["sub"]
+    except jwt.InvalidTokenError as e:
+        logging.error("JWT decode error: %s", e)
         raise credentials_exception
         
     try:
-        user = db.query(User).filter(User.id == int(user_id)).first()
-        if user is None:
+        user = _load_user(db, int(user_id))
+        if user is None or not user.is_active:
             raise credentials_exception
+        _cache_user(token, user, payload.get("exp"))
         return user
+    except HTTPException:
+        raise
     except Exception as e:
-        logging.error(f"Database query error: {str(e)}")
+        logging.error("Database query error: %s", e)
         raise credentials_exception 
\ No newline at end of file
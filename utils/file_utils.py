@@ -0,0 +1,9 @@
+import os
+from typing import BinaryIO
+
+def file_size(fileobj: BinaryIO) -> int:
+    """Get the size of a seekable file without reading it, leaving it rewound"""
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
+    return size
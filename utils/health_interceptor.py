@@ -0,0 +1,38 @@
+import orjson
+
+class HealthCheckInterceptor:
+    """
+    Pure ASGI wrapper that answers liveness probes before they reach FastAPI.
+    Requests to the configured paths skip middleware, routing and dependency
+    resolution and get a pre-serialized JSON response.
+    """
+
+    def __init__(self, app, paths):
+        self.app = app
+        self.paths = set(paths)
+        self.body = orjson.dumps({"status": "ok"})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] != "GET":
+            await send({
+                "type": "http.response.start",
+                "status": 405,
+                "headers": [(b"allow", b"GET"), (b"content-length", b"0")]
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(self.body)).encode()),
+                (b"cache-control", b"public, max-age=5")
+            ]
+        })
+        await send({"type": "http.response.body", "body": self.body})
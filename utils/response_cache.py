@@ -0,0 +1,75 @@
+from functools import lru_cache
+from config import get_settings
+import logging
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=1)
+def get_redis():
+    """Get the shared Redis client, or None when REDIS_URL is not configured"""
+    redis_url = get_settings().redis_url
+    if not redis_url or redis is None:
+        return None
+    # Short timeouts so an unreachable cache never stalls the request
+    return redis.Redis.from_url(
+        redis_url,
+        socket_timeout=0.5,
+        socket_connect_timeout=0.5
+    )
+
+def cache_get(key: bytes):
+    """Get a cached response body shared by all workers, None on miss or cache failure"""
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        return client.get(key)
+    except redis.RedisError as e:
+        logger.warning("Response cache read failed for %s: %s", key, e)
+        return None
+
+def cache_set(key: bytes, body: bytes, ttl: int):
+    """Store a response body for ttl seconds, cache failures are ignored"""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.set(key, body, ex=ttl)
+    except redis.RedisError as e:
+        logger.warning("Response cache write failed for %s: %s", key, e)
+
+def cache_hget(key: bytes, field: bytes):
+    """Get one entry of a cached group of response bodies, None on miss or cache failure"""
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        return client.hget(key, field)
+    except redis.RedisError as e:
+        logger.warning("Response cache read failed for %s: %s", key, e)
+        return None
+
+def cache_hset(key: bytes, field: bytes, body: bytes, ttl: int):
+    """Store one entry of a group of response bodies, the whole group expires after ttl seconds"""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.pipeline(transaction=False).hset(key, field, body).expire(key, ttl).execute()
+    except redis.RedisError as e:
+        logger.warning("Response cache write failed for %s: %s", key, e)
+
+def cache_incr(key: bytes):
+    """Increment a counter, e.g. a cache generation, cache failures are ignored"""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.incr(key)
+    except redis.RedisError as e:
+        logger.warning("Response cache increment failed for %s: %s", key, e)
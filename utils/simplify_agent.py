@@ -1,24 +1,19 @@
 from typing import List, Dict, Any
 import autogen
 from utils.vector_store import VectorStore
-import os
-from dotenv import load_dotenv
+from config import get_settings
 from openai import OpenAI
-import time
 from tenacity import retry, stop_after_attempt, wait_exponential
 from fastapi import HTTPException
 import re
 
-# Load environment variables
-load_dotenv()
-
 class SimplifyAgent:
     def __init__(self):
         # Initialize vector store
         self.vector_store = VectorStore()
         
-        # Get OpenAI API key from environment
-        api_key = os.getenv("OPENAI_API_KEY")
+        # Get OpenAI API key from settings
+        api_key = get_settings().openai_api_key
         if not api_key:
             raise ValueError("OPENAI_API_KEY not found in environment variables")
         
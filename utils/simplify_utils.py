@@ -1,14 +1,9 @@
 from openai import AsyncOpenAI
-import os
-from dotenv import load_dotenv
+from config import get_settings
 from typing import List
-import re
-
-# Load environment variables
-load_dotenv()
 
 # Initialize OpenAI client
-openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+openai_client = AsyncOpenAI(api_key=get_settings().openai_api_key)
 
 async def process_text(text: str) -> str:
     """
@@ -2,25 +2,25 @@ from qdrant_client import QdrantClient
 from qdrant_client.http import models
 from sentence_transformers import SentenceTransformer
 from typing import List, Dict, Any
-import os
-from dotenv import load_dotenv
+from config import get_settings
+import logging
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger(__name__)
 
 class VectorStore:
     def __init__(self):
         # Initialize Qdrant client
+        settings = get_settings()
         self.client = QdrantClient(
-            url=os.getenv("QDRANT_URL", "http://localhost:6333"),
-            api_key=os.getenv("QDRANT_API_KEY", "")
+            url=settings.qdrant_url,
+            api_key=settings.qdrant_api_key
         )
         
         # Initialize sentence transformer for embeddings
         try:
             self.encoder = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2', cache_folder='./models')
         except Exception as e:
-            print(f"Error loading model: {e}")
+            logger.error("Error loading model: %s", e)
             # Fallback to a simpler model
             self.encoder = SentenceTransformer('sentence-transformers/paraphrase-MiniLM-L3-v2', cache_folder='./models')
         
@@ -0,0 +1,9 @@
+from uvicorn_worker import UvicornWorker
+
+class AppUvicornWorker(UvicornWorker):
+    """Gunicorn worker class running the app on uvloop and httptools"""
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        "limit_concurrency": 1000  # Shed load with 503s instead of queueing without bound
+    }